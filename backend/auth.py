@@ -1,10 +1,14 @@
 # auth.py
 import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerifyMismatchError
 from datetime import datetime, timedelta
-from jose import jwt
 import hashlib
+import threading
+import time
 
-from jose import JWTError, jwt
+import jwt
+from jwt import InvalidTokenError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
@@ -15,40 +19,47 @@ SECRET_KEY = "secret123"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Built once at import so per-request decoding only does the HMAC check
+_JWT = jwt.PyJWT()
+_JWT_OPTIONS = {"require": ["exp", "sub"]}
+_SECRET_BYTES = SECRET_KEY.encode()
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# argon2id parameters for new hashes; rows written before the switch still
+# hold bcrypt hashes and are verified through the legacy path below
+password_hasher = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=1)
+BCRYPT_PREFIXES = ("$2b$", "$2a$", "$2y$")
+
 def hash_password(password: str):
-    """Hash a password using bcrypt with proper handling"""
-    # Convert to bytes and handle length limit
-    password_bytes = password.encode('utf-8')
-    
-    # If password is too long, pre-hash with SHA256
-    if len(password_bytes) > 72:
-        # Pre-hash with SHA256 to get fixed 64-byte length
-        password_bytes = hashlib.sha256(password_bytes).digest()
-    
-    # Generate salt and hash
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    return hashed.decode('utf-8')
+    """Hash a password using argon2id"""
+    return password_hasher.hash(password)
 
 def verify_password(plain: str, hashed: str):
-    """Verify a password against its hash"""
-    # Convert hashed password back to bytes
-    hashed_bytes = hashed.encode('utf-8')
-    
-    # Convert plain password to bytes with same logic
-    plain_bytes = plain.encode('utf-8')
-    if len(plain_bytes) > 72:
-        plain_bytes = hashlib.sha256(plain_bytes).digest()
-    
-    return bcrypt.checkpw(plain_bytes, hashed_bytes)
+    """Verify a password against its hash (argon2id or legacy bcrypt)"""
+    if hashed.startswith(BCRYPT_PREFIXES):
+        # Legacy bcrypt rows were pre-hashed with SHA256 when over 72 bytes
+        plain_bytes = plain.encode('utf-8')
+        if len(plain_bytes) > 72:
+            plain_bytes = hashlib.sha256(plain_bytes).digest()
+        return bcrypt.checkpw(plain_bytes, hashed.encode('utf-8'))
+
+    try:
+        return password_hasher.verify(hashed, plain)
+    except (VerifyMismatchError, InvalidHashError):
+        return False
+
+def password_needs_rehash(hashed: str):
+    """True for legacy bcrypt hashes or argon2 hashes with outdated parameters"""
+    if hashed.startswith(BCRYPT_PREFIXES):
+        return True
+    return password_hasher.check_needs_rehash(hashed)
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return _JWT.encode(to_encode, _SECRET_BYTES, algorithm=ALGORITHM)
 
 
 
@@ -59,6 +70,40 @@ def get_db():
     finally:
         db.close()
 
+# Verified tokens -> (user_id, expires_at), so repeat requests with the same
+# bearer token skip the JWT decode and email lookup. Failed validations are
+# never cached.
+TOKEN_CACHE_TTL_SECONDS = 60
+TOKEN_CACHE_MAX_SIZE = 10_000
+_token_cache: dict[str, tuple[int, float]] = {}
+_token_cache_lock = threading.Lock()
+
+def _get_cached_user_id(token: str):
+    with _token_cache_lock:
+        entry = _token_cache.get(token)
+        if entry is None:
+            return None
+        user_id, expires_at = entry
+        if expires_at <= time.time():
+            del _token_cache[token]
+            return None
+        return user_id
+
+def _cache_token(token: str, user_id: int, exp):
+    now = time.time()
+    ttl = min(exp - now, TOKEN_CACHE_TTL_SECONDS) if exp is not None else 0
+    if ttl <= 0:
+        return
+    with _token_cache_lock:
+        if len(_token_cache) >= TOKEN_CACHE_MAX_SIZE:
+            # Drop the oldest entry (dicts keep insertion order)
+            del _token_cache[next(iter(_token_cache))]
+        _token_cache[token] = (user_id, now + ttl)
+
+def _evict_token(token: str):
+    with _token_cache_lock:
+        _token_cache.pop(token, None)
+
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -68,15 +113,26 @@ def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+    user_id = _get_cached_user_id(token)
+    if user_id is not None:
+        user = db.get(models.User, user_id)
+        if user is not None:
+            return user
+        _evict_token(token)
+        raise credentials_exception
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
+        payload = _JWT.decode(
+            token, _SECRET_BYTES, algorithms=[ALGORITHM], options=_JWT_OPTIONS
+        )
+    except InvalidTokenError:
         raise credentials_exception
 
+    email: str = payload["sub"]
     user = db.query(models.User).filter(models.User.email == email).first()
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+
+    _cache_token(token, user.id, payload.get("exp"))
+    return user
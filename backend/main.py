@@ -1,19 +1,28 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from sqlalchemy import Integer
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 import models, schemas
 from database import SessionLocal, engine
-from auth import hash_password, verify_password, create_access_token, get_current_user
+from auth import hash_password, verify_password, password_needs_rehash, create_access_token, get_current_user
 
 from fastapi import File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, ORJSONResponse
+import asyncio
+import csv
 import os
+import shutil
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pacsv
 from datetime import datetime
 
 from typing import Optional
 from datetime import date
 from fastapi import Query
-from sqlalchemy import func
+from sqlalchemy import func, or_, select, tuple_
 
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -25,8 +34,62 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Multithreaded, block-based CSV parsing for uploaded files
+CSV_READ_OPTIONS = pacsv.ReadOptions(use_threads=True, block_size=8 << 20)
+TRANSACTION_CSV_CONVERT_OPTIONS = pacsv.ConvertOptions(
+    column_types={"amount": pa.float64()},
+    strings_can_be_null=True
+)
+TRANSACTION_TYPES = pa.array(["credit", "debit"])
+UPLOAD_CHUNK_SIZE = 1 << 20
+MAX_UPLOAD_BYTES = 50 << 20
+UPLOAD_PATHS = {"/upload-transactions-csv"}
+
+# Caps concurrent password hashes so a burst of /register or /login requests
+# queues instead of saturating every core. Waiters park on the event loop
+# rather than in the threadpool, so they never hold a worker thread that
+# other sync endpoints and dependencies need.
+hash_slots = asyncio.Semaphore(os.cpu_count() or 1)
+
 app = FastAPI(title="User Auth API")
 
+class UploadSizeLimitMiddleware:
+    """Caps request bodies on upload paths; every other path passes straight through"""
+
+    def __init__(self, app, max_bytes: int, paths: set[str]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        # Declared size: reject before any of the body is read
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse(status_code=413, content={"detail": "File too large"})
+            await response(scope, receive, send)
+            return
+
+        # Chunked or understated bodies: count bytes as they arrive
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail="File too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+# Added before CORS so rejected uploads still carry CORS headers
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES, paths=UPLOAD_PATHS)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  
@@ -44,38 +107,99 @@ def get_db():
     finally:
         db.close()
 
-# ✅ Register
-@app.post("/register", response_model=schemas.UserResponse)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing_username = db.query(models.User).filter(models.User.username == user.username).first()
-    existing_email = db.query(models.User).filter(models.User.email == user.email).first()
-    if existing_username:
-        raise HTTPException(status_code=400, detail="Username already exists")
-    if existing_email:
-        raise HTTPException(status_code=400, detail="Email already exists")
-
+def save_upload(file: UploadFile, file_path: str):
+    """Copy an upload to disk in fixed-size chunks instead of reading it whole"""
+    with open(file_path, "wb") as f:
+        shutil.copyfileobj(file.file, f, UPLOAD_CHUNK_SIZE)
+
+def read_csv_header(file: UploadFile):
+    """Read only the header row of an upload, leaving the file rewound"""
+    line = file.file.readline().decode("utf-8-sig")
+    file.file.seek(0)
+    return next(csv.reader([line]), [])
+
+def first_false(mask):
+    """Index of the first false (or null) entry in a boolean Arrow column"""
+    index = pc.index(pc.fill_null(mask, False), False).as_py()
+    return None if index < 0 else index
+
+def parse_transaction_dates(column):
+    """Transaction dates as a date32 column, null where a value is unparseable"""
+    if pa.types.is_date32(column.type):
+        return column
+    if pa.types.is_timestamp(column.type):
+        return pc.cast(column, pa.date32(), safe=False)
+    # pyarrow only infers ISO dates; parse anything else row by row like
+    # pandas did before, so mixed formats in one file are still accepted
+    parsed = pd.to_datetime(column.to_pandas(), errors="coerce", format="mixed")
+    return pa.array(parsed.dt.date, type=pa.date32(), from_pandas=True)
+
+async def run_password_hash(func, *args):
+    """Run a password hash/verify in the threadpool, bounded by hash_slots"""
+    async with hash_slots:
+        return await run_in_threadpool(func, *args)
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
     new_user = models.User(
         name=user.name,
         username=user.username,
         email=user.email,
-        hashed_password=hash_password(user.password)
+        hashed_password=hashed_password
     )
     db.add(new_user)
-    db.commit()
+    # The unique indexes on username/email reject duplicates in the INSERT
+    # itself; only look up which one collided when that happens
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = db.query(models.User.username, models.User.email).filter(
+            or_(models.User.username == user.username, models.User.email == user.email)
+        ).first()
+        if existing is None:
+            raise
+        if existing.username == user.username:
+            raise HTTPException(status_code=400, detail="Username already exists")
+        raise HTTPException(status_code=400, detail="Email already exists")
     db.refresh(new_user)
     return new_user
 
+def get_user_by_email(db: Session, email: str):
+    return db.query(models.User).filter(models.User.email == email).first()
+
+def update_password_hash(db: Session, db_user: models.User, hashed_password: str):
+    db_user.hashed_password = hashed_password
+    db.commit()
+
+# ✅ Register
+# Hashing and session work both run in the threadpool so the event loop
+# never blocks on argon2 or on a SQLite write lock
+@app.post("/register", response_model=schemas.UserResponse)
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    hashed_password = await run_password_hash(hash_password, user.password)
+    return await run_in_threadpool(create_user, db, user, hashed_password)
+
 # ✅ Login
 @app.post("/login")
-def login(user: schemas.UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+async def login(user: schemas.UserLogin, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(get_user_by_email, db, user.email)
+    if not db_user or not await run_password_hash(
+        verify_password, user.password, db_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
 
-    token = create_access_token({"sub": db_user.email})
+    # Read before any commit expires the instance and forces a reload
+    email = db_user.email
+
+    # Upgrade legacy bcrypt hashes so later logins skip the bcrypt path
+    if password_needs_rehash(db_user.hashed_password):
+        hashed_password = await run_password_hash(hash_password, user.password)
+        await run_in_threadpool(update_password_hash, db, db_user, hashed_password)
+
+    token = create_access_token({"sub": email})
     return {"access_token": token, "token_type": "bearer"}
 
 
@@ -89,12 +213,22 @@ async def upload_transactions_csv(
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="Only CSV files allowed")
 
+    # Reject files with the wrong columns before saving or parsing them
+    required_cols = {"amount", "type", "category", "description", "transaction_date"}
+    try:
+        header = read_csv_header(file)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid CSV file")
+    if not required_cols.issubset(header):
+        raise HTTPException(
+            status_code=400,
+            detail=f"CSV must contain columns: {required_cols}"
+        )
+
     # 1️⃣ Save file to disk
     file_path = os.path.join(UPLOAD_DIR, file.filename)
 
-    content = await file.read()
-    with open(file_path, "wb") as f:
-        f.write(content)
+    await run_in_threadpool(save_upload, file, file_path)
 
     # 2️⃣ Save file record in DB
     new_file = models.UploadedFile(
@@ -107,54 +241,66 @@ async def upload_transactions_csv(
 
     # 3️⃣ Read CSV from saved file
     try:
-        df = pd.read_csv(file_path)
+        table = pacsv.read_csv(
+            file_path,
+            read_options=CSV_READ_OPTIONS,
+            convert_options=TRANSACTION_CSV_CONVERT_OPTIONS
+        )
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid CSV file")
 
-    required_cols = {"amount", "type", "category", "description", "transaction_date"}
-    if not required_cols.issubset(df.columns):
+    # 4️⃣ Validate and prepare transactions on the Arrow columns
+    types = pc.utf8_lower(table.column("type").cast(pa.string()))
+    invalid_row = first_false(pc.is_in(types, value_set=TRANSACTION_TYPES))
+    if invalid_row is not None:
         raise HTTPException(
             status_code=400,
-            detail=f"CSV must contain columns: {required_cols}"
+            detail=f"Invalid type at row {invalid_row + 2}. Must be credit/debit"
+        )
+
+    categories = table.column("category").cast(pa.string())
+    invalid_row = first_false(pc.is_valid(categories))
+    if invalid_row is not None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Missing category at row {invalid_row + 2}"
         )
 
-    # 4️⃣ Parse and prepare transactions
-    transactions = []
-    for idx, row in df.iterrows():
-        tx_type = str(row["type"]).lower()
-        if tx_type not in ("credit", "debit"):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid type at row {idx + 2}. Must be credit/debit"
-            )
-
-        try:
-            tx_date = pd.to_datetime(row["transaction_date"]).date()
-        except Exception:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid date at row {idx + 2}. Use YYYY-MM-DD"
-            )
-
-        tx = models.Transaction(
-            user_id=current_user.id,
-            amount=float(row["amount"]),
-            type=tx_type,
-            category=str(row["category"]),
-            description=str(row.get("description", "")),
-            transaction_date=tx_date
+    dates = parse_transaction_dates(table.column("transaction_date"))
+    invalid_row = first_false(pc.is_valid(dates))
+    if invalid_row is not None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid date at row {invalid_row + 2}. Use YYYY-MM-DD"
         )
-        transactions.append(tx)
+
+    records = [
+        {
+            "user_id": current_user.id,
+            "amount": amount,
+            "type": tx_type,
+            "category": category,
+            "description": description,
+            "transaction_date": tx_date,
+        }
+        for amount, tx_type, category, description, tx_date in zip(
+            table.column("amount").to_pylist(),
+            types.to_pylist(),
+            categories.to_pylist(),
+            table.column("description").cast(pa.string()).to_pylist(),
+            dates.to_pylist(),
+        )
+    ]
 
     # 5️⃣ Save transactions
-    db.add_all(transactions)
+    db.bulk_insert_mappings(models.Transaction, records)
     db.commit()
 
     return {
         "message": "File uploaded and transactions imported successfully",
         "filename": file.filename,
         "file_id": new_file.id,
-        "transactions_imported": len(transactions)
+        "transactions_imported": len(records)
     }
 
 
@@ -167,10 +313,20 @@ def get_my_transactions(
     end_date: Optional[date] = None,
     min_amount: Optional[float] = None,
     max_amount: Optional[float] = None,
+    limit: int = Query(100, ge=1, le=500),
+    before_date: Optional[date] = None,
+    before_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    query = db.query(models.Transaction).filter(
+    if (before_date is None) != (before_id is None):
+        raise HTTPException(
+            status_code=400,
+            detail="before_date and before_id must be provided together"
+        )
+
+    # Plain Core rows: skips ORM hydration for this read-only listing
+    query = select(models.Transaction.__table__).filter(
         models.Transaction.user_id == current_user.id
     )
 
@@ -192,8 +348,25 @@ def get_my_transactions(
     if max_amount is not None:
         query = query.filter(models.Transaction.amount <= max_amount)
 
-    results = query.order_by(models.Transaction.transaction_date.desc()).all()
-    return results
+    # Keyset pagination on (transaction_date, id), newest first
+    if before_date is not None:
+        query = query.filter(
+            tuple_(models.Transaction.transaction_date, models.Transaction.id)
+            < (before_date, before_id)
+        )
+
+    query = query.order_by(
+        models.Transaction.transaction_date.desc(),
+        models.Transaction.id.desc()
+    ).limit(limit)
+    results = [dict(row) for row in db.execute(query).mappings()]
+
+    next_cursor = None
+    if len(results) == limit:
+        last = results[-1]
+        next_cursor = {"before_date": last["transaction_date"], "before_id": last["id"]}
+
+    return ORJSONResponse({"items": results, "next": next_cursor})
 
 
 # ✅ Transactions Summary with Filters
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, CheckConstraint, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -50,6 +50,10 @@ class Transaction(Base):
 
     __table_args__ = (
         CheckConstraint("type IN ('credit', 'debit')", name="check_transaction_type"),
+        # Cover the /my-transactions and /transactions-summary filters
+        Index("ix_tx_user_date", "user_id", transaction_date.desc()),
+        Index("ix_tx_user_type_date", "user_id", "type", "transaction_date"),
+        Index("ix_tx_user_cat", "user_id", "category"),
     )
 
     